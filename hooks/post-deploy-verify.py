@@ -21,23 +21,56 @@ import re
 import sys
 from typing import Optional
 
+# Regex patterns are compiled once at import time rather than on every call
+# Matches wrangler deploy (and legacy publish) via npx, pnpm exec, bunx, etc.
+# The runner prefix is irrelevant since every form contains "wrangler deploy"
+_DEPLOY_RE = re.compile(r"wrangler\s+(?:deploy|publish)")
+
+# Pattern: "Published <name> (<version>)\n  https://worker.domain.workers.dev"
+# or "Deployed <name> to https://..."
+_URL_PATTERNS = [
+    re.compile(p)
+    for p in (
+        r"https://[\w.-]+\.workers\.dev",
+        r"https://[\w.-]+\.pages\.dev",
+        r"Published.*?\n\s+(https://[^\s]+)",
+        r"Deployed.*?to\s+(https://[^\s]+)",
+    )
+]
+
+# First line containing a non-whitespace character (whole line, as printed)
+_FIRST_NONBLANK_LINE_RE = re.compile(r"^[^\S\n]*\S.*$", re.MULTILINE)
+
+_PUBLISHED_RE = re.compile(r"Published\s+(\S+)")
+_DEPLOYED_RE = re.compile(r"Deployed\s+(\S+)")
+_NAME_RE = re.compile(r"--name[=\s]+(\S+)")
+
+# One scan finds every warning class; the group name maps to its message.
+# Each branch is a zero-width lookahead so a long match (e.g. "secret ... not
+# found") never consumes the start of another class inside its span
+_WARNING_RE = re.compile(
+    r"(?=(?P<deprecated>deprecat))"
+    r"|(?=(?P<compatibility>compatibility.*?date.*?old))"
+    r"|(?=(?P<routes>no routes))"
+    r"|(?=(?P<secret>secret.*?not.*?found))",
+    re.IGNORECASE,
+)
+_WARNING_MESSAGES = {
+    "deprecated": "Deprecated feature detected",
+    "compatibility": "Compatibility date may need updating",
+    "routes": "No routes configured - worker may not be accessible",
+    "secret": "Missing secret binding",
+}
+
 
 def is_wrangler_deploy(command: str) -> bool:
     """Check if command is a wrangler deploy."""
     if not command:
         return False
 
-    # Match various deploy patterns
-    patterns = [
-        r"wrangler\s+deploy",
-        r"wrangler\s+publish",  # Legacy
-        r"npx\s+wrangler\s+deploy",
-        r"pnpm\s+(?:exec\s+)?wrangler\s+deploy",
-        r"bunx?\s+wrangler\s+deploy",
-    ]
-
     command_lower = command.lower()
-    return any(re.search(p, command_lower) for p in patterns)
+    # Substring check first; most Bash commands never mention wrangler
+    return "wrangler" in command_lower and _DEPLOY_RE.search(command_lower) is not None
 
 
 def extract_deployment_url(stdout: str) -> Optional[str]:
@@ -45,17 +78,8 @@ def extract_deployment_url(stdout: str) -> Optional[str]:
     if not stdout:
         return None
 
-    # Pattern: "Published <name> (<version>)\n  https://worker.domain.workers.dev"
-    # or "Deployed <name> to https://..."
-    patterns = [
-        r"https://[\w.-]+\.workers\.dev",
-        r"https://[\w.-]+\.pages\.dev",
-        r"Published.*?\n\s+(https://[^\s]+)",
-        r"Deployed.*?to\s+(https://[^\s]+)",
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, stdout)
+    for pattern in _URL_PATTERNS:
+        match = pattern.search(stdout)
         if match:
             # Return the captured group if exists, otherwise full match
             return match.group(1) if match.lastindex else match.group(0)
@@ -67,18 +91,18 @@ def extract_worker_name(stdout: str, command: str) -> Optional[str]:
     """Extract worker name from output or command."""
     if stdout:
         # "Published my-worker (1.0.0)"
-        match = re.search(r"Published\s+(\S+)", stdout)
+        match = _PUBLISHED_RE.search(stdout)
         if match:
             return match.group(1)
 
         # "Deployed my-worker to..."
-        match = re.search(r"Deployed\s+(\S+)", stdout)
+        match = _DEPLOYED_RE.search(stdout)
         if match:
             return match.group(1)
 
     # Try from command: wrangler deploy --name my-worker
     if command:
-        match = re.search(r"--name[=\s]+(\S+)", command)
+        match = _NAME_RE.search(command)
         if match:
             return match.group(1)
 
@@ -99,28 +123,31 @@ def check_deployment_success(exit_code: int, stdout: str, stderr: str) -> dict:
     if exit_code != 0:
         result["errors"].append(f"Deploy failed with exit code {exit_code}")
         if stderr:
-            # Extract meaningful error
-            error_lines = [l for l in stderr.split("\n") if l.strip()]
-            if error_lines:
-                result["errors"].append(error_lines[0][:200])
+            # Extract meaningful error - stop at the first non-blank line
+            # rather than splitting what can be a long stack trace
+            first_line = _FIRST_NONBLANK_LINE_RE.search(stderr)
+            if first_line:
+                result["errors"].append(first_line.group(0)[:200])
         return result
 
     result["success"] = True
     result["url"] = extract_deployment_url(stdout)
 
-    # Check for warnings in output
-    combined = (stdout or "") + (stderr or "")
-    warning_patterns = [
-        (r"deprecat", "Deprecated feature detected"),
-        (r"compatibility.*date.*old", "Compatibility date may need updating"),
-        (r"no routes", "No routes configured - worker may not be accessible"),
-        (r"secret.*not.*found", "Missing secret binding"),
+    # Check for warnings in output - scan each stream in place rather than
+    # copying both into one combined string
+    found = set()
+    for text in (stdout, stderr):
+        if not text or len(found) == len(_WARNING_MESSAGES):
+            continue
+        for match in _WARNING_RE.finditer(text):
+            found.add(match.lastgroup)
+            if len(found) == len(_WARNING_MESSAGES):
+                break  # Every warning class already seen
+
+    result["warnings"] = [
+        message for name, message in _WARNING_MESSAGES.items() if name in found
     ]
 
-    for pattern, message in warning_patterns:
-        if re.search(pattern, combined, re.IGNORECASE):
-            result["warnings"].append(message)
-
     return result
 
 
@@ -161,9 +188,17 @@ def format_verification_message(result: dict, worker_name: Optional[str]) -> str
 
 def main():
     """Main entry point."""
+    raw_input = sys.stdin.buffer.read()
+
+    # Cheap byte checks before parsing: responses from other tools (Read,
+    # Grep...) and non-wrangler commands can be large and never need a
+    # full JSON decode
+    if b'"Bash"' not in raw_input or b"wrangler" not in raw_input.lower():
+        sys.exit(0)
+
     try:
-        input_data = json.load(sys.stdin)
-    except json.JSONDecodeError:
+        input_data = json.loads(raw_input)
+    except (json.JSONDecodeError, UnicodeDecodeError):
         sys.exit(0)
 
     tool_name = input_data.get("tool_name", "")
@@ -191,7 +226,7 @@ def main():
 
     # Output verification message
     message = format_verification_message(result, worker_name)
-    print(message)
+    sys.stdout.buffer.write(f"{message}\n".encode("utf-8"))
 
     sys.exit(0)
 
@@ -16,23 +16,212 @@ Exit codes:
 - 2: Block deployment (critical issues found)
 """
 
+import bisect
+import hashlib
 import json
 import os
 import re
 import sys
 from pathlib import Path
-import subprocess
 
 
-def debug_log(message: str) -> None:
-    """Log debug messages to temp file."""
+# Audit results cache, reused while none of the audited inputs have changed
+AUDIT_CACHE_PATH = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    / "cloudflare-engineer"
+    / "pre-deploy-audit.json"
+)
+AUDIT_CACHE_MAX_PROJECTS = 16
+# PREDEPLOY_NOCACHE=1 forces a fresh audit (no cached results)
+CACHE_DISABLED = os.environ.get("PREDEPLOY_NOCACHE", "").lower() in ("1", "true", "yes")
+
+# Known heavy packages that inflate bundle size (approximate KB).
+# A bare scope such as "@aws-sdk" matches every package in that scope
+HEAVY_PACKAGES = {
+    "moment": 300,  # ~300KB
+    "lodash": 500,  # ~500KB if not tree-shaken
+    "aws-sdk": 2000,  # ~2MB
+    "@aws-sdk": 1000,  # ~1MB per service
+    "sharp": 5000,  # Native - won't work anyway
+}
+
+# Config filenames in lookup priority order
+_WRANGLER_CONFIG_NAMES = ("wrangler.jsonc", "wrangler.toml", "wrangler.json")
+
+# Severity markers used in the warnings section of the report
+_SEVERITY_EMOJI = {"CRITICAL": "🔴", "HIGH": "🟠", "MEDIUM": "🟡", "LOW": "🔵", "INFO": "🔵"}
+
+# Issues listed per report section; the rest are summarised as "... and N more"
+MAX_ISSUES_PER_SECTION = 50
+
+# Regex patterns are compiled once at import time rather than on every call
+# Matches wrangler deploy directly or via npx/pnpm/yarn - every runner
+# form contains "wrangler deploy", so one pattern covers them all
+_DEPLOY_RE = re.compile(r"\bwrangler\s+deploy\b")  # Matched against the lowercased command
+
+_SECRET_KEY_RE = re.compile(r"API_KEY|SECRET|PASSWORD|TOKEN|PRIVATE|CREDENTIAL", re.IGNORECASE)
+
+# JSONC tokens: a string literal (group 1), a line comment, or a block comment
+_JSONC_TOKEN_RE = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?(?:\*/|\Z)', re.DOTALL)
+# A string literal (group 1) or a comma directly before a closing bracket
+_TRAILING_COMMA_RE = re.compile(r'("(?:\\.|[^"\\])*")|,(?=\s*[}\]])')
+
+# Inline suppression comments: // @pre-deploy-ok [RULE ...] or /* ... */
+# Run over whole files, so whitespace is [^\S\n] (never crosses a line)
+_SUPPRESSION_RE = re.compile(
+    r'(?://|/\*)[^\S\n]*@pre-deploy-ok(?:[^\S\n]+([A-Z0-9_ \t\r\f\v]+))?(?:[^\S\n]*\*/)?',
+    re.IGNORECASE
+)
+
+# Context embedded in issue messages, used for .pre-deploy-ignore matching.
+# No message names both a resource and a file location, so one search suffices
+_ISSUE_CONTEXT_RE = re.compile(r"Queue '(?P<queue>[^']+)'|bucket '(?P<bucket>[^']+)'| at (?P<file>[^:]+):\d+")
+
+# Test file paths (matched against the lowercased path), as one alternation
+_TEST_FILE_RE = re.compile("|".join((
+    r'\.test\.[jt]sx?$',        # file.test.ts, file.test.js
+    r'\.spec\.[jt]sx?$',        # file.spec.ts, file.spec.js
+    r'_test\.[jt]sx?$',         # file_test.ts
+    r'__tests__/',              # __tests__/file.ts
+    r'/tests?/',                # /test/file.ts, /tests/file.ts
+    r'\.stories\.[jt]sx?$',     # Storybook files
+    r'\.e2e\.[jt]sx?$',         # E2E test files
+    r'/fixtures?/',             # /fixture/, /fixtures/
+    r'/mocks?/',                # /mock/, /mocks/
+)))
+
+# SKIP_PREDEPLOY_CHECK set inline in the command (SKIP_PREDEPLOY_CHECK=1 npx wrangler deploy)
+_BYPASS_RE = re.compile(r'\bSKIP_PREDEPLOY_CHECK\s*=\s*["\']?(?:1|true|yes)["\']?', re.IGNORECASE)
+
+# R2 reads
+_GET_CALL_RE = re.compile(r'\.get\s*\([^)]+\)')
+# .get() inside an app/router route handler or a fetch(request) handler.
+# Handler bodies span lines, so newlines are allowed, but every repeat is
+# bounded so a file with no closing brace can't backtrack over the whole
+# rest of the file. Kept as separate patterns: each starts with a literal,
+# which lets the regex engine skip ahead far faster than an alternation
+_R2_ROUTE_PATTERNS = [
+    re.compile(p)
+    for p in (
+        r'app\.(?:get|post)\s*\([^,]{1,200},\s*async[^}]{1,2000}\.get\s*\(',
+        r'router\.(?:get|post)\s*\([^,]{1,200},\s*async[^}]{1,2000}\.get\s*\(',
+        r'fetch\s*\([^)]{0,200}request[^)]{0,200}\)[^}]{0,2000}\.get\s*\(',
+    )
+]
+
+# D1 queries
+# QUERY001 matches only the statement head; the rest of the statement (up to
+# ';', bounded) is then checked for LIMIT and single-row WHERE id lookups
+_SELECT_STAR_RE = re.compile(r'\bSELECT\s+\*\s+FROM\s+\w+\b', re.IGNORECASE)
+_SQL_STATEMENT_WINDOW = 2000
+_WHERE_ID_RE = re.compile(r'\s+WHERE\s+\w*ID\s*=')  # Matched against the uppercased statement tail
+_DRIZZLE_PATTERNS = [
+    (re.compile(pattern, re.MULTILINE | re.DOTALL), desc)
+    for pattern, desc in (
+        (r'\.select\(\)[^;]*\.from\([^)]+\)(?![^;]*\.limit\()', "select().from() without .limit()"),
+        (r'\.findMany\(\s*\{(?![^}]*limit:)', "findMany() without limit option"),
+    )
+]
+
+# Loop-sensitive patterns to detect: (pattern, literals, rule_id, severity, message, fix, detection_type)
+# A pattern only runs on files containing at least one of its literals, so most files skip the regex
+_LOOP_PATTERN_SOURCES = [
+    # D1 queries in loops
+    (
+        r'(for|while|forEach|\.map)\s*\([^)]*\)[^{]*\{[^}]*\.(prepare|run|first|all)\s*\(',
+        (".prepare", ".run", ".first", ".all"),
+        "LOOP002",
+        "CRITICAL",
+        "D1 query inside loop - N+1 cost explosion",
+        "Use db.batch() for bulk operations (TRAP-D1-001)",
+        "STATIC",
+    ),
+    # R2 writes in loops
+    (
+        r'(for|while|forEach|\.map)\s*\([^)]*\)[^{]*\{[^}]*\.put\s*\(',
+        (".put",),
+        "LOOP003",
+        "HIGH",
+        "R2 write inside loop - Class A operation explosion",
+        "Buffer writes or use multipart upload (TRAP-R2-001)",
+        "STATIC",
+    ),
+    # setInterval without clear pattern
+    (
+        r'setInterval\s*\([^)]+\)',
+        ("setInterval",),
+        "LOOP004",
+        "MEDIUM",
+        "setInterval detected - verify termination condition exists",
+        "Use state.storage.setAlarm() in Durable Objects for hibernation",
+        "STATIC",
+    ),
+    # Unbounded while loops
+    (
+        r'while\s*\(\s*true\s*\)|for\s*\(\s*;\s*;\s*\)',
+        ("while", "for"),
+        "LOOP007",
+        "CRITICAL",
+        "Unbounded loop detected - could run until CPU limit",
+        "Add explicit break condition and iteration limit",
+        "STATIC",
+    ),
+    # Self-fetch patterns
+    (
+        r'fetch\s*\(\s*request\.url',
+        ("request.url",),
+        "LOOP005",
+        "CRITICAL",
+        "Worker fetching own URL - potential infinite recursion",
+        "Add X-Recursion-Depth middleware (see loop-breaker skill)",
+        "STATIC",
+    ),
+]
+_LOOP_PATTERNS = [
+    (re.compile(pattern, re.MULTILINE | re.DOTALL), literals, rule_id, severity, message, fix, detection)
+    for pattern, literals, rule_id, severity, message, fix, detection in _LOOP_PATTERN_SOURCES
+]
+
+# LOOP005 recursion: function headers (see find_recursive_calls), then depth checks
+# in the matched span itself, or in the surrounding context
+_FUNCTION_HEADER_RE = re.compile(r'(async\s+)?function\s+(\w+)')
+_DEPTH_CHECK_RE = re.compile(r'(depth|maxDepth|level|count)\s*[<>=!]')
+_DEPTH_CONTEXT_RE = re.compile(r'(depth|maxDepth|level)\s*[:<>=]|if\s*\(\s*(depth|maxDepth|level)', re.IGNORECASE)
+
+# Cost simulation: D1 and R2 writes in loops
+_D1_WRITE_LOOP_RE = re.compile(r'(for|while|forEach)\s*\([^)]*\)[^{]*\{[^}]*\.(run|batch)\s*\(', re.MULTILINE | re.DOTALL)
+_R2_WRITE_LOOP_RE = re.compile(r'(for|while|forEach)\s*\([^)]*\)[^{]*\.put\s*\(', re.MULTILINE | re.DOTALL)
+
+# Workers AI inference call: env.AI.run("@cf/...")
+_AI_RUN_RE = re.compile(r'\.run\s*\(\s*["\']@cf/')
+
+# Expensive models that should trigger a cost warning (AI001), found in one
+# pass over the lowercased source. No name overlaps another, so finditer
+# sees every occurrence of each
+_EXPENSIVE_AI_MODELS = (
+    "llama-3.1-405b",
+    "llama-3.3-70b",
+    "deepseek-r1",
+    "claude",  # If using AI Gateway to Claude
+)
+_EXPENSIVE_AI_MODEL_RE = re.compile("|".join(re.escape(model) for model in _EXPENSIVE_AI_MODELS))
+
+
+# Debug logging is opt-in (CF_HOOK_DEBUG=1); the log file is opened once per run
+_debug_file = None
+if os.environ.get("CF_HOOK_DEBUG", "").lower() in ("1", "true", "yes"):
     try:
-        with open("/tmp/cf-pre-deploy-check.log", "a") as f:
-            f.write(f"{message}\n")
-    except:
+        _debug_file = open("/tmp/cf-pre-deploy-check.log", "a", buffering=1)
+    except OSError:
         pass
 
 
+def debug_log(message: str) -> None:
+    """Log debug messages to temp file when CF_HOOK_DEBUG is set."""
+    if _debug_file is not None:
+        _debug_file.write(f"{message}\n")
+
+
 def extract_suppressions(content: str) -> dict[int, set[str]]:
     """Extract @pre-deploy-ok suppression comments from file content.
 
@@ -46,40 +235,44 @@ def extract_suppressions(content: str) -> dict[int, set[str]]:
     A None in the set means all rules are suppressed for that line.
     """
     suppressions = {}
-    lines = content.split('\n')
-
-    # Pattern to match suppression comments
-    suppression_pattern = re.compile(
-        r'(?://|/\*)\s*@pre-deploy-ok(?:\s+([A-Z0-9_\s]+))?(?:\s*\*/)?',
-        re.IGNORECASE
-    )
 
-    for i, line in enumerate(lines):
-        match = suppression_pattern.search(line)
-        if match:
-            rules_str = match.group(1)
-            if rules_str:
-                # Specific rules listed
-                rules = set(r.strip().upper() for r in rules_str.split() if r.strip())
-            else:
-                # No rules = suppress all
-                rules = {None}
+    # One scan over the whole file; line numbers are counted incrementally
+    # between matches instead of splitting the file into lines
+    line_num = 1
+    last_pos = 0
+    for match in _SUPPRESSION_RE.finditer(content):
+        line_num += content.count('\n', last_pos, match.start())
+        last_pos = match.start()
+
+        rules_str = match.group(1)
+        if rules_str:
+            # Specific rules listed
+            rules = set(r.upper() for r in rules_str.split())
+        else:
+            # No rules = suppress all
+            rules = {None}
 
-            # Suppression applies to current line and next line
-            # (supports both inline and line-before styles)
-            suppressions[i + 1] = suppressions.get(i + 1, set()) | rules
-            suppressions[i + 2] = suppressions.get(i + 2, set()) | rules
+        # Suppression applies to current line and next line
+        # (supports both inline and line-before styles)
+        suppressions.setdefault(line_num, set()).update(rules)
+        suppressions.setdefault(line_num + 1, set()).update(rules)
 
     return suppressions
 
 
 def is_suppressed(suppressions: dict[int, set[str]], line_num: int, rule_id: str) -> bool:
-    """Check if a rule is suppressed at a given line number."""
-    if line_num not in suppressions:
+    """Check if a rule is suppressed at a given line number.
+
+    Rule IDs are emitted in upper case and suppression rules are stored
+    upper-cased, so no per-call normalisation is needed.
+    """
+    if not suppressions:
+        return False  # Most files have no suppression comments
+    rules = suppressions.get(line_num)
+    if rules is None:
         return False
-    rules = suppressions[line_num]
     # None means all rules are suppressed
-    return None in rules or rule_id.upper() in rules
+    return None in rules or rule_id in rules
 
 
 def load_ignore_file(working_dir: str) -> tuple[dict[str, set[str]], set[str]]:
@@ -154,28 +347,147 @@ def load_ignore_file(working_dir: str) -> tuple[dict[str, set[str]], set[str]]:
     return ignore_rules, blocking_rules
 
 
+def dedupe_issues(issues: list[dict]) -> list[dict]:
+    """Drop repeated issues, keeping first-seen order.
+
+    Issues are keyed by rule and message; source findings include
+    file:line in the message, so distinct locations are kept.
+    """
+    seen = set()
+    unique_issues = []
+    for issue in issues:
+        key = (issue["id"], issue["message"])
+        if key not in seen:
+            seen.add(key)
+            unique_issues.append(issue)
+    return unique_issues
+
+
 def is_test_file(file_path: str) -> bool:
     """Check if a file is a test file based on common naming conventions.
 
     Test files often contain unbounded queries for setup/teardown,
     which would otherwise trigger false positives.
     """
-    test_patterns = [
-        r'\.test\.[jt]sx?$',        # file.test.ts, file.test.js
-        r'\.spec\.[jt]sx?$',        # file.spec.ts, file.spec.js
-        r'_test\.[jt]sx?$',         # file_test.ts
-        r'__tests__/',              # __tests__/file.ts
-        r'/tests?/',                # /test/file.ts, /tests/file.ts
-        r'\.stories\.[jt]sx?$',     # Storybook files
-        r'\.e2e\.[jt]sx?$',         # E2E test files
-        r'/fixtures?/',             # /fixture/, /fixtures/
-        r'/mocks?/',                # /mock/, /mocks/
-    ]
-    file_path_lower = file_path.lower()
-    for pattern in test_patterns:
-        if re.search(pattern, file_path_lower):
-            return True
-    return False
+    return _TEST_FILE_RE.search(file_path.lower()) is not None
+
+
+def get_line_starts(content: str) -> list[int]:
+    """Offsets at which each line of content starts (for bisect lookups)."""
+    starts = [0]
+    pos = content.find("\n")
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = content.find("\n", pos + 1)
+    return starts
+
+
+def source_line_number(source: dict, offset: int) -> int:
+    """1-based line number of offset in a source file's content.
+
+    The line index is built on first use and kept on the source entry, so
+    each match is a binary search instead of counting newlines from the
+    start of the file.
+    """
+    line_starts = source.get("line_starts")
+    if line_starts is None:
+        line_starts = source["line_starts"] = get_line_starts(source["content"])
+    return bisect.bisect_right(line_starts, offset)
+
+
+def source_suppressions(source: dict) -> dict[int, set[str]]:
+    """@pre-deploy-ok suppressions of a source file.
+
+    Extracted on first use and kept on the source entry, so each file's
+    comments are scanned once however many scanners check it.
+    """
+    suppressions = source.get("suppressions")
+    if suppressions is None:
+        suppressions = source["suppressions"] = extract_suppressions(source["content"])
+    return suppressions
+
+
+def _find_last_call(content: str, name: str, start: int, end: int) -> int:
+    """Return the end offset of the last `name\\s*(` within content[start:end], or -1."""
+    pos = content.rfind(name, start, end)
+    while pos >= 0:
+        i = pos + len(name)
+        while i < end and content[i].isspace():
+            i += 1
+        if i < end and content[i] == "(":
+            return i + 1
+        pos = content.rfind(name, start, pos + len(name) - 1)
+    return -1
+
+
+def find_recursive_calls(content: str):
+    """Yield (start, end) spans of functions that call themselves.
+
+    Two-stage equivalent of r'(async\\s+)?function\\s+(\\w+)[^{]*\\{[^}]*\\2\\s*\\(':
+    a cheap regex finds each function header, then str.rfind looks for the
+    call between the body's opening brace and the first closing brace, so
+    the regex never backtracks over function bodies. Like the regex, the
+    longest name prefix and the last call in that range win.
+    """
+    pos = 0
+    while True:
+        header = _FUNCTION_HEADER_RE.search(content, pos)
+        if not header:
+            return
+        body_start = content.find("{", header.end())
+        if body_start < 0:
+            return  # No later header can have a body either
+        body_end = content.find("}", body_start + 1)
+        if body_end < 0:
+            body_end = len(content)
+
+        name = header.group(2)
+        call_end = -1
+        for length in range(len(name), 0, -1):
+            call_end = _find_last_call(content, name[:length], body_start + 1, body_end)
+            if call_end >= 0:
+                break
+
+        if call_end >= 0:
+            yield header.start(), call_end
+            pos = call_end
+        else:
+            pos = header.start() + 1
+
+
+def load_source_files(working_dir: str) -> list[dict]:
+    """Read every .ts file under src/ once, for all source scanners to share.
+
+    Each entry has the absolute "path", the "relative_path" used in issue
+    messages, and the file "content". Unreadable files and .d.ts
+    declarations (types only, no code) are skipped, and node_modules
+    directories are pruned without being listed.
+    """
+    sources = []
+    src_dir = str(Path(working_dir) / "src")
+
+    if "node_modules" in src_dir:
+        return sources
+
+    for dirpath, dirnames, filenames in os.walk(src_dir):
+        dirnames[:] = [d for d in dirnames if "node_modules" not in d]
+        for filename in filenames:
+            # .d.ts declaration files hold types only, never runtime code
+            if not filename.endswith(".ts") or filename.endswith(".d.ts") or "node_modules" in filename:
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                with open(path, "r") as f:
+                    content = f.read()
+                sources.append({
+                    "path": path,
+                    "relative_path": os.path.relpath(path, working_dir),
+                    "content": content,
+                })
+            except Exception:
+                pass
+
+    return sources
 
 
 def is_rule_ignored(ignore_rules: dict[str, set[str]], rule_id: str, context: str = "") -> bool:
@@ -211,28 +523,24 @@ def filter_ignored_issues(issues: list[dict], ignore_rules: dict[str, set[str]])
     filtered = []
     for issue in issues:
         rule_id = issue.get("id", "")
-        message = issue.get("message", "")
-
-        # Extract context from message if present (e.g., queue name, bucket name, file path)
-        context = ""
 
-        # Try to extract queue name
-        queue_match = re.search(r"Queue '([^']+)'", message)
-        if queue_match:
-            context = queue_match.group(1)
+        # Most issues have no ignore entry - skip context extraction for them
+        rule_contexts = ignore_rules.get(rule_id)
+        if rule_contexts is None:
+            filtered.append(issue)
+            continue
+        if '' in rule_contexts:
+            debug_log(f"Ignored {rule_id} (context: global)")
+            continue
 
-        # Try to extract bucket name
-        bucket_match = re.search(r"bucket '([^']+)'", message)
-        if bucket_match:
-            context = bucket_match.group(1)
+        message = issue.get("message", "")
 
-        # Try to extract file path (e.g., "at src/file.ts:227")
-        if not context:
-            file_match = re.search(r' at ([^:]+):\d+', message)
-            if file_match:
-                file_path = file_match.group(1)
-                # Try full path first, then just filename
-                context = file_path
+        # Extract context from message if present: queue name, bucket name,
+        # or file path (e.g., "at src/file.ts:227") - one search for all three
+        context = ""
+        context_match = _ISSUE_CONTEXT_RE.search(message)
+        if context_match:
+            context = context_match.group("queue") or context_match.group("bucket") or context_match.group("file")
 
         # Also try just the filename for convenience
         contexts_to_check = [context]
@@ -255,89 +563,36 @@ def filter_ignored_issues(issues: list[dict], ignore_rules: dict[str, set[str]])
 
 def is_wrangler_deploy(command: str) -> bool:
     """Check if command is a wrangler deploy command."""
-    # Match various forms of wrangler deploy
-    patterns = [
-        r"\bwrangler\s+deploy\b",
-        r"\bnpx\s+wrangler\s+deploy\b",
-        r"\bpnpm\s+.*wrangler\s+deploy\b",
-        r"\byarn\s+.*wrangler\s+deploy\b",
-    ]
-    for pattern in patterns:
-        if re.search(pattern, command, re.IGNORECASE):
-            return True
-    return False
+    command_lower = command.lower()
+    # Substring check first; most Bash commands never mention wrangler
+    return "wrangler" in command_lower and _DEPLOY_RE.search(command_lower) is not None
 
 
 def find_wrangler_config(working_dir: str) -> str | None:
     """Find wrangler.toml or wrangler.jsonc in working directory."""
-    for filename in ["wrangler.jsonc", "wrangler.toml", "wrangler.json"]:
-        path = Path(working_dir) / filename
-        if path.exists():
-            return str(path)
+    # One directory listing instead of a stat() per candidate name
+    try:
+        with os.scandir(working_dir) as entries:
+            names = {entry.name for entry in entries if entry.is_file()}
+    except OSError:
+        return None
+
+    for filename in _WRANGLER_CONFIG_NAMES:
+        if filename in names:
+            return os.path.join(working_dir, filename)
     return None
 
 
 def parse_jsonc(content: str) -> dict:
     """Parse JSONC (JSON with comments) content."""
-    # Process character by character to handle comments correctly
-    result = []
-    i = 0
-    n = len(content)
-    in_string = False
-    escape = False
-
-    while i < n:
-        char = content[i]
-
-        if escape:
-            result.append(char)
-            escape = False
-            i += 1
-            continue
+    # Strings are matched as whole tokens so "/*" in URL patterns is kept,
+    # while comments outside strings are replaced with nothing
+    content = _JSONC_TOKEN_RE.sub(lambda m: m.group(1) or "", content)
 
-        if char == "\\" and in_string:
-            result.append(char)
-            escape = True
-            i += 1
-            continue
-
-        if char == '"':
-            result.append(char)
-            in_string = not in_string
-            i += 1
-            continue
-
-        if in_string:
-            result.append(char)
-            i += 1
-            continue
-
-        # Not in string - check for comments
-        if char == "/" and i + 1 < n:
-            next_char = content[i + 1]
-            if next_char == "/":
-                # Single-line comment - skip to end of line
-                while i < n and content[i] != "\n":
-                    i += 1
-                continue
-            elif next_char == "*":
-                # Multi-line comment - skip to */
-                i += 2
-                while i < n - 1:
-                    if content[i] == "*" and content[i + 1] == "/":
-                        i += 2
-                        break
-                    i += 1
-                continue
-
-        result.append(char)
-        i += 1
-
-    content = "".join(result)
-
-    # Remove trailing commas (multiple passes for nested structures)
-    for _ in range(5):
-        content = re.sub(r",\s*([}\]])", r"\1", content)
+    # Remove trailing commas in one pass; the lookahead leaves the bracket
+    # unconsumed, so nested ",]," sequences are all caught, and commas
+    # inside strings are left alone
+    content = _TRAILING_COMMA_RE.sub(lambda m: m.group(1) or "", content)
 
     return json.loads(content)
 
@@ -345,10 +600,12 @@ def parse_jsonc(content: str) -> dict:
 def parse_toml_simple(content: str) -> dict:
     """Simple TOML parser for wrangler configs.
 
+    Fallback for Python < 3.11 without tomli installed; tomllib is used
+    whenever it is available.
+
     Handles both regular sections [section] and array-of-tables [[section]]
     which is common in wrangler.toml for r2_buckets, kv_namespaces, etc.
     """
-    # This is a simplified parser - for production, use tomllib
     result = {}
     current_section = result
     current_array_table = None  # Track current array-of-tables name
@@ -409,32 +666,55 @@ def parse_toml_simple(content: str) -> dict:
             key = key.strip()
             value = value.strip().strip('"').strip("'")
             # Handle boolean values
-            if value.lower() == "true":
+            lowered = value.lower()
+            if lowered == "true":
                 value = True
-            elif value.lower() == "false":
+            elif lowered == "false":
                 value = False
-            # Handle numeric values
-            elif value.isdigit():
-                value = int(value)
-            elif re.match(r'^-?\d+$', value):
-                value = int(value)
-            elif re.match(r'^-?\d+\.\d+$', value):
-                value = float(value)
+            # Handle numeric values - plain digits with an optional sign and
+            # fraction only, so quoted "1_000", "1e5" or "nan" stay strings
+            else:
+                digits = value[1:] if value.startswith("-") else value
+                whole, dot, frac = digits.partition(".")
+                if whole.isdecimal() and (not dot or frac.isdecimal()):
+                    value = float(value) if dot else int(value)
             current_section[key] = value
 
     return result
 
 
+def parse_toml(content: str) -> dict:
+    """Parse TOML with tomllib when available, else the simple fallback.
+
+    Imported here rather than at module level: the hook runs on every Bash
+    command and tomllib costs more to import than the rest of the hook.
+    """
+    try:
+        import tomllib  # Python 3.11+
+    except ImportError:
+        try:
+            import tomli as tomllib  # Same parser, packaged for older Pythons
+        except ImportError:
+            return parse_toml_simple(content)
+    return tomllib.loads(content)
+
+
+# Config parsers by file extension; unknown extensions are treated as JSONC
+_CONFIG_PARSERS = {
+    ".toml": parse_toml,
+    ".json": parse_jsonc,
+    ".jsonc": parse_jsonc,
+}
+
+
 def load_wrangler_config(config_path: str) -> dict | None:
     """Load and parse wrangler config file."""
     try:
         with open(config_path, "r") as f:
             content = f.read()
 
-        if config_path.endswith(".toml"):
-            return parse_toml_simple(content)
-        else:
-            return parse_jsonc(content)
+        parser = _CONFIG_PARSERS.get(os.path.splitext(config_path)[1], parse_jsonc)
+        return parser(content)
     except Exception as e:
         debug_log(f"Failed to parse config: {e}")
         return None
@@ -445,28 +725,20 @@ def check_secrets_in_vars(config: dict) -> list[dict]:
     issues = []
     vars_section = config.get("vars", {})
 
-    secret_patterns = [
-        r"API_KEY",
-        r"SECRET",
-        r"PASSWORD",
-        r"TOKEN",
-        r"PRIVATE",
-        r"CREDENTIAL",
-    ]
-
     for key, value in vars_section.items():
-        for pattern in secret_patterns:
-            if re.search(pattern, key, re.IGNORECASE):
-                # Check if value looks like an actual secret (not a placeholder)
-                if value and len(str(value)) > 8 and not value.startswith("${"):
-                    issues.append({
-                        "id": "SEC001",
-                        "severity": "CRITICAL",
-                        "message": f"Potential secret in plaintext: vars.{key}",
-                        "fix": f"Use: wrangler secret put {key}",
-                        "detection": "HEURISTIC",
-                        "verify": f"Check if vars.{key} contains an actual secret value",
-                    })
+        # One search per key - a key like MY_SECRET_TOKEN is reported once
+        if not _SECRET_KEY_RE.search(key):
+            continue
+        # Check if value looks like an actual secret (not a placeholder)
+        if value and len(str(value)) > 8 and not str(value).startswith("${"):
+            issues.append({
+                "id": "SEC001",
+                "severity": "CRITICAL",
+                "message": f"Potential secret in plaintext: vars.{key}",
+                "fix": f"Use: wrangler secret put {key}",
+                "detection": "HEURISTIC",
+                "verify": f"Check if vars.{key} contains an actual secret value",
+            })
 
     return issues
 
@@ -507,6 +779,18 @@ def check_smart_placement(config: dict) -> list[dict]:
     return issues
 
 
+def get_declared_dependencies(working_dir: str) -> set[str] | None:
+    """Return dependency names from package.json, or None if unavailable."""
+    try:
+        with open(os.path.join(working_dir, "package.json"), "r") as f:
+            package = json.load(f)
+        deps = set(package.get("dependencies") or {})
+        deps.update(package.get("devDependencies") or {})
+        return deps
+    except (OSError, ValueError, AttributeError, TypeError):
+        return None
+
+
 def check_bundle_size(working_dir: str, config: dict) -> list[dict]:
     """Check estimated bundle size against tier limits (Performance Budgeter)."""
     issues = []
@@ -525,32 +809,40 @@ def check_bundle_size(working_dir: str, config: dict) -> list[dict]:
     for check_dir in [dist_dir, src_dir]:
         if check_dir.exists():
             try:
-                # Sum up all .js, .ts, .mjs files
+                # Sum up all .js, .ts, .mjs, .json files in one walk,
+                # pruning node_modules without listing it
                 total_size = 0
-                for ext in ["*.js", "*.ts", "*.mjs", "*.json"]:
-                    for f in check_dir.rglob(ext):
-                        if "node_modules" not in str(f):
-                            total_size += f.stat().st_size
+                for dirpath, dirnames, filenames in os.walk(check_dir):
+                    dirnames[:] = [d for d in dirnames if "node_modules" not in d]
+                    for filename in filenames:
+                        if os.path.splitext(filename)[1] in (".js", ".ts", ".mjs", ".json"):
+                            total_size += os.stat(os.path.join(dirpath, filename)).st_size
                 estimated_size_kb = total_size / 1024
                 break
             except Exception:
                 pass
 
-    # Check node_modules for heavy dependencies
-    node_modules = Path(working_dir) / "node_modules"
+    # Check for heavy dependencies - package.json when present (one read,
+    # and it also sees packages hoisted to a workspace root), otherwise
+    # probe node_modules directly
     heavy_deps = []
-    if node_modules.exists():
-        # Known heavy packages that inflate bundle size
-        heavy_packages = {
-            "moment": 300,  # ~300KB
-            "lodash": 500,  # ~500KB if not tree-shaken
-            "aws-sdk": 2000,  # ~2MB
-            "@aws-sdk": 1000,  # ~1MB per service
-            "sharp": 5000,  # Native - won't work anyway
-        }
-        for pkg, size in heavy_packages.items():
-            pkg_path = node_modules / pkg
-            if pkg_path.exists():
+    declared_deps = get_declared_dependencies(working_dir)
+    if declared_deps is not None:
+        for pkg, size in HEAVY_PACKAGES.items():
+            scope_prefix = pkg + "/"
+            if pkg in declared_deps or any(dep.startswith(scope_prefix) for dep in declared_deps):
+                heavy_deps.append((pkg, size))
+                estimated_size_kb += size
+    else:
+        # One listing of node_modules instead of a stat() per package;
+        # scoped packages such as @aws-sdk are top-level directories too
+        try:
+            with os.scandir(os.path.join(working_dir, "node_modules")) as entries:
+                installed = {entry.name for entry in entries}
+        except OSError:
+            installed = set()
+        for pkg, size in HEAVY_PACKAGES.items():
+            if pkg in installed:
                 heavy_deps.append((pkg, size))
                 estimated_size_kb += size
 
@@ -674,7 +966,7 @@ def check_deprecated_site_config(config: dict) -> list[dict]:
     return issues
 
 
-def check_r2_infrequent_access(working_dir: str, config: dict) -> list[dict]:
+def check_r2_infrequent_access(sources: list[dict], config: dict) -> list[dict]:
     """Check for R2 Infrequent Access storage usage with reads (NEW v1.4.0).
 
     NOTE: This is a HEURISTIC check based on bucket naming conventions.
@@ -685,10 +977,6 @@ def check_r2_infrequent_access(working_dir: str, config: dict) -> list[dict]:
     but actually using Standard storage class.
     """
     issues = []
-    src_dir = Path(working_dir) / "src"
-
-    if not src_dir.exists():
-        return issues
 
     # Check if there are R2 buckets configured
     r2_buckets = config.get("r2_buckets", [])
@@ -708,108 +996,94 @@ def check_r2_infrequent_access(working_dir: str, config: dict) -> list[dict]:
     if not ia_suspect_buckets:
         return issues
 
-    # Scan for .get() calls only if we have IA-suspect buckets
-    for ts_file in src_dir.rglob("*.ts"):
-        if "node_modules" in str(ts_file):
+    # Scan for .get() calls only if we have IA-suspect buckets. The first
+    # unsuppressed read in a file without caching flags every suspect bucket
+    # once, so the scan stops there
+    for source in sources:
+        content = source["content"]
+        if ".get" not in content:
+            continue  # No .get() call possible - skip the regex scan
+
+        # Reads behind the Cache API or Cache-Control headers are fine
+        has_cache = 'caches.default' in content or 'cache.match' in content.lower()
+        has_cache_control = 'Cache-Control' in content or 'cacheControl' in content
+        if has_cache or has_cache_control:
             continue
 
         try:
-            content = ts_file.read_text()
-            relative_path = ts_file.relative_to(working_dir)
+            relative_path = source["relative_path"]
 
             # Extract suppressions from this file
-            suppressions = extract_suppressions(content)
+            suppressions = source_suppressions(source)
 
             # Find .get() calls with line numbers
-            get_pattern = re.compile(r'\.get\s*\([^)]+\)')
-            for match in get_pattern.finditer(content):
-                line_num = content[:match.start()].count('\n') + 1
+            for match in _GET_CALL_RE.finditer(content):
+                line_num = source_line_number(source, match.start())
 
                 # Check if this issue is suppressed
                 if is_suppressed(suppressions, line_num, "BUDGET009"):
                     debug_log(f"Suppressed BUDGET009 at {relative_path}:{line_num}")
                     continue
 
-                # Check if Cache API is used
-                has_cache = 'caches.default' in content or 'cache.match' in content.lower()
-                has_cache_control = 'Cache-Control' in content or 'cacheControl' in content
-
-                if not has_cache and not has_cache_control:
-                    for bucket_name in ia_suspect_buckets:
-                        issues.append({
-                            "id": "BUDGET009",
-                            "severity": "INFO",  # Downgraded from HIGH - this is speculative
-                            "message": f"R2 bucket '{bucket_name}' name suggests Infrequent Access - verify storage class",
-                            "fix": "If using IA storage: switch to Standard for buckets with reads. IA is only safe for write-only.",
-                            "detection": "HEURISTIC",
-                            "verify": f"Check bucket storage class in CF dashboard: R2 > {bucket_name} > Settings",
-                        })
-                        break
+                for bucket_name in ia_suspect_buckets:
+                    issues.append({
+                        "id": "BUDGET009",
+                        "severity": "INFO",  # Downgraded from HIGH - this is speculative
+                        "message": f"R2 bucket '{bucket_name}' name suggests Infrequent Access - verify storage class",
+                        "fix": "If using IA storage: switch to Standard for buckets with reads. IA is only safe for write-only.",
+                        "detection": "HEURISTIC",
+                        "verify": f"Check bucket storage class in CF dashboard: R2 > {bucket_name} > Settings",
+                    })
+                return issues
 
         except Exception:
             pass
 
-    # Deduplicate - only one warning per bucket
-    seen_buckets = set()
-    unique_issues = []
-    for issue in issues:
-        # Extract bucket name from message
-        bucket_match = re.search(r"bucket '([^']+)'", issue["message"])
-        if bucket_match:
-            bucket = bucket_match.group(1)
-            if bucket not in seen_buckets:
-                seen_buckets.add(bucket)
-                unique_issues.append(issue)
-        else:
-            unique_issues.append(issue)
-
-    return unique_issues
+    return issues
 
 
-def check_d1_query_patterns(working_dir: str) -> list[dict]:
+def check_d1_query_patterns(sources: list[dict]) -> list[dict]:
     """Check for D1 query anti-patterns (NEW v1.5.0)."""
     issues = []
-    src_dir = Path(working_dir) / "src"
 
-    if not src_dir.exists():
-        return issues
-
-    for ts_file in src_dir.rglob("*.ts"):
-        if "node_modules" in str(ts_file):
-            continue
+    for source in sources:
         # Skip test files - they often use unbounded queries for setup/teardown
-        if is_test_file(str(ts_file)):
+        if is_test_file(source["path"]):
+            continue
+
+        # Every pattern below needs SELECT (any case) or .findMany(
+        content = source["content"]
+        if "SELECT" not in content.upper() and ".findMany(" not in content:
             continue
 
         try:
-            content = ts_file.read_text()
-            relative_path = ts_file.relative_to(working_dir)
+            relative_path = source["relative_path"]
 
             # Extract suppressions from this file
-            suppressions = extract_suppressions(content)
+            suppressions = source_suppressions(source)
 
             # QUERY001: SELECT * without LIMIT
-            select_star_pattern = re.compile(
-                r'SELECT\s+\*\s+FROM\s+\w+(?:\s+WHERE[^;]*)?(?!\s+LIMIT)',
-                re.IGNORECASE | re.MULTILINE
-            )
-            for match in select_star_pattern.finditer(content):
-                line_num = content[:match.start()].count('\n') + 1
+            for match in _SELECT_STAR_RE.finditer(content):
+                line_num = source_line_number(source, match.start())
 
                 if is_suppressed(suppressions, line_num, "QUERY001"):
                     debug_log(f"Suppressed QUERY001 at {relative_path}:{line_num}")
                     continue
 
-                # Check if LIMIT exists later in the same statement
-                stmt_end = content.find(';', match.end())
-                if stmt_end != -1:
-                    rest = content[match.end():stmt_end].upper()
-                    if 'LIMIT' in rest:
-                        continue  # LIMIT found later
+                # Rest of the statement: up to ';', bounded so a file without
+                # semicolons can't make every match scan to the end
+                window_end = match.end() + _SQL_STATEMENT_WINDOW
+                stmt_end = content.find(';', match.end(), window_end)
+                if stmt_end == -1:
+                    stmt_end = window_end
+                # Upper-case only the tail - str.upper() can change length
+                # ("ß" -> "SS"), so match offsets don't carry over to a copy
+                tail = content[match.end():stmt_end].upper()
+                if 'LIMIT' in tail:
+                    continue  # LIMIT found later in the statement
 
                 # Check for single-row patterns (WHERE id = ?) - these are safe
-                match_text = match.group(0)
-                if re.search(r'WHERE\s+\w*id\s*=', match_text, re.IGNORECASE):
+                if _WHERE_ID_RE.match(tail):
                     continue  # Single row lookup by ID is safe
 
                 issues.append({
@@ -821,14 +1095,9 @@ def check_d1_query_patterns(working_dir: str) -> list[dict]:
                 })
 
             # QUERY005: Drizzle .all() or .findMany() without .limit()
-            drizzle_patterns = [
-                (r'\.select\(\)[^;]*\.from\([^)]+\)(?![^;]*\.limit\()', "select().from() without .limit()"),
-                (r'\.findMany\(\s*\{(?![^}]*limit:)', "findMany() without limit option"),
-            ]
-            for pattern, desc in drizzle_patterns:
-                drizzle_regex = re.compile(pattern, re.MULTILINE | re.DOTALL)
+            for drizzle_regex, desc in _DRIZZLE_PATTERNS:
                 for match in drizzle_regex.finditer(content):
-                    line_num = content[:match.start()].count('\n') + 1
+                    line_num = source_line_number(source, match.start())
 
                     if is_suppressed(suppressions, line_num, "QUERY005"):
                         debug_log(f"Suppressed QUERY005 at {relative_path}:{line_num}")
@@ -845,138 +1114,107 @@ def check_d1_query_patterns(working_dir: str) -> list[dict]:
         except Exception:
             pass
 
-    # Deduplicate
-    seen = set()
-    unique_issues = []
-    for issue in issues:
-        key = (issue["id"], issue["message"])
-        if key not in seen:
-            seen.add(key)
-            unique_issues.append(issue)
-
-    return unique_issues
+    return issues
 
 
-def check_r2_cache_patterns(working_dir: str) -> list[dict]:
+def check_r2_cache_patterns(sources: list[dict]) -> list[dict]:
     """Check for R2.get() without cache wrapper (NEW v1.5.0)."""
     issues = []
-    src_dir = Path(working_dir) / "src"
 
-    if not src_dir.exists():
-        return issues
-
-    for ts_file in src_dir.rglob("*.ts"):
-        if "node_modules" in str(ts_file):
+    for source in sources:
+        content = source["content"]
+        # Route patterns all end in .get( - and files using the Cache API are fine
+        if ".get" not in content:
+            continue
+        if 'caches.default' in content or 'cache.match' in content:
             continue
 
         try:
-            content = ts_file.read_text()
-            relative_path = ts_file.relative_to(working_dir)
+            relative_path = source["relative_path"]
 
             # Extract suppressions from this file
-            suppressions = extract_suppressions(content)
-
-            # Check if file uses R2 .get() but doesn't use cache
-            has_r2_get = re.search(r'\.\s*get\s*\([^)]+\)', content)
-            has_cache_api = 'caches.default' in content or 'cache.match' in content
-
-            if has_r2_get and not has_cache_api:
-                # Find R2 get patterns on hot paths (routes)
-                route_patterns = [
-                    r'app\.(get|post)\s*\([^,]+,\s*async[^}]+\.get\s*\(',
-                    r'router\.(get|post)\s*\([^,]+,\s*async[^}]+\.get\s*\(',
-                    r'fetch\s*\([^)]*request[^)]*\)[^}]*\.get\s*\(',
-                ]
-                for pattern in route_patterns:
-                    route_regex = re.compile(pattern, re.MULTILINE | re.DOTALL)
-                    for match in route_regex.finditer(content):
-                        line_num = content[:match.start()].count('\n') + 1
-
-                        if is_suppressed(suppressions, line_num, "R2002"):
-                            debug_log(f"Suppressed R2002 at {relative_path}:{line_num}")
-                            continue
-
-                        issues.append({
-                            "id": "R2002",
-                            "severity": "MEDIUM",
-                            "message": f"R2.get() on request path without cache at {relative_path}:{line_num}",
-                            "fix": "Wrap with caches.default for edge caching (TRAP-R2-006)",
-                            "detection": "STATIC",
-                        })
-                        break  # One warning per file
+            suppressions = source_suppressions(source)
+
+            # Find R2 get patterns on hot paths (routes) - one warning per file
+            found = False
+            for route_regex in _R2_ROUTE_PATTERNS:
+                for match in route_regex.finditer(content):
+                    line_num = source_line_number(source, match.start())
+
+                    if is_suppressed(suppressions, line_num, "R2002"):
+                        debug_log(f"Suppressed R2002 at {relative_path}:{line_num}")
+                        continue
+
+                    issues.append({
+                        "id": "R2002",
+                        "severity": "MEDIUM",
+                        "message": f"R2.get() on request path without cache at {relative_path}:{line_num}",
+                        "fix": "Wrap with caches.default for edge caching (TRAP-R2-006)",
+                        "detection": "STATIC",
+                    })
+                    found = True
+                    break
+                if found:
+                    break
 
         except Exception:
             pass
 
-    # Deduplicate
-    seen = set()
-    unique_issues = []
-    for issue in issues:
-        key = (issue["id"], issue["message"])
-        if key not in seen:
-            seen.add(key)
-            unique_issues.append(issue)
-
-    return unique_issues
+    # At most one issue per file, each naming its file - nothing to deduplicate
+    return issues
 
 
-def check_ai_patterns(working_dir: str, config: dict) -> list[dict]:
+def check_ai_patterns(sources: list[dict], config: dict) -> list[dict]:
     """Check for Workers AI usage patterns (NEW v1.6.0).
 
     AI001: Expensive model usage without cost awareness
     AI002: AI binding without cache wrapper (consider caching)
     """
     issues = []
-    src_dir = Path(working_dir) / "src"
-
-    if not src_dir.exists():
-        return issues
 
     # Check if project has AI binding
     ai_binding = config.get("ai", {})
     if not ai_binding and "[ai]" not in str(config):
         return issues
 
-    # Expensive models that should trigger cost warning
-    expensive_models = [
-        "llama-3.1-405b",
-        "llama-3.3-70b",
-        "deepseek-r1",
-        "claude",  # If using AI Gateway to Claude
-    ]
-
-    for ts_file in src_dir.rglob("*.ts"):
-        if "node_modules" in str(ts_file):
-            continue
-
+    for source in sources:
         try:
-            content = ts_file.read_text()
-            relative_path = ts_file.relative_to(working_dir)
+            content = source["content"]
+            relative_path = source["relative_path"]
 
             # Extract suppressions from this file
-            suppressions = extract_suppressions(content)
-
-            # AI001: Check for expensive models
-            for model in expensive_models:
-                if model in content.lower():
-                    # Find the exact line
-                    for line_num, line in enumerate(content.split('\n'), 1):
-                        if model in line.lower():
-                            if is_suppressed(suppressions, line_num, "AI001"):
-                                debug_log(f"Suppressed AI001 at {relative_path}:{line_num}")
-                                continue
-
-                            issues.append({
-                                "id": "AI001",
-                                "severity": "HIGH",
-                                "message": f"Expensive AI model '{model}' at {relative_path}:{line_num}",
-                                "fix": "Consider smaller model or implement request batching (TRAP-AI-001)",
-                                "detection": "STATIC",
-                            })
-                            break
-
-            # AI002: Check for AI.run without cache wrapper
-            has_ai_run = re.search(r'\.run\s*\(\s*["\']@cf/', content)
+            suppressions = source_suppressions(source)
+
+            # AI001: Check for expensive models (first unsuppressed line per model)
+            content_lower = content.lower()
+            model_lines = {}
+            line_num = 1
+            last_pos = 0
+            for match in _EXPENSIVE_AI_MODEL_RE.finditer(content_lower):
+                model = match.group(0)
+                if model in model_lines:
+                    continue
+                # Counted on the lowercased text, whose lines match the original's
+                line_num += content_lower.count("\n", last_pos, match.start())
+                last_pos = match.start()
+                if is_suppressed(suppressions, line_num, "AI001"):
+                    debug_log(f"Suppressed AI001 at {relative_path}:{line_num}")
+                    continue
+                model_lines[model] = line_num
+
+            for model in _EXPENSIVE_AI_MODELS:
+                if model in model_lines:
+                    issues.append({
+                        "id": "AI001",
+                        "severity": "HIGH",
+                        "message": f"Expensive AI model '{model}' at {relative_path}:{model_lines[model]}",
+                        "fix": "Consider smaller model or implement request batching (TRAP-AI-001)",
+                        "detection": "STATIC",
+                    })
+
+            # AI002: Check for AI.run without cache wrapper (every model id
+            # starts with "@cf/", so files without it skip the regex)
+            has_ai_run = "@cf/" in content and _AI_RUN_RE.search(content)
             has_cache_check = any([
                 'caches.default' in content,
                 'cache.match' in content,
@@ -984,39 +1222,32 @@ def check_ai_patterns(working_dir: str, config: dict) -> list[dict]:
             ])
 
             if has_ai_run and not has_cache_check:
-                # Find the first AI.run call
-                for line_num, line in enumerate(content.split('\n'), 1):
-                    if re.search(r'\.run\s*\(\s*["\']@cf/', line):
-                        if is_suppressed(suppressions, line_num, "AI002"):
-                            debug_log(f"Suppressed AI002 at {relative_path}:{line_num}")
-                            continue
-
-                        issues.append({
-                            "id": "AI002",
-                            "severity": "MEDIUM",
-                            "message": f"AI inference without cache at {relative_path}:{line_num}",
-                            "fix": "Consider caching AI responses for repeated prompts (reduces cost + latency)",
-                            "detection": "HEURISTIC",
-                            "verify": "Check if prompts are dynamic (caching may not apply)",
-                        })
-                        break
+                # Find the first AI.run call written on a single line
+                for match in _AI_RUN_RE.finditer(content):
+                    if "\n" in match.group(0):
+                        continue
+                    line_num = source_line_number(source, match.start())
+                    if is_suppressed(suppressions, line_num, "AI002"):
+                        debug_log(f"Suppressed AI002 at {relative_path}:{line_num}")
+                        continue
+
+                    issues.append({
+                        "id": "AI002",
+                        "severity": "MEDIUM",
+                        "message": f"AI inference without cache at {relative_path}:{line_num}",
+                        "fix": "Consider caching AI responses for repeated prompts (reduces cost + latency)",
+                        "detection": "HEURISTIC",
+                        "verify": "Check if prompts are dynamic (caching may not apply)",
+                    })
+                    break
 
         except Exception:
             pass
 
-    # Deduplicate
-    seen = set()
-    unique_issues = []
-    for issue in issues:
-        key = (issue["id"], issue["message"])
-        if key not in seen:
-            seen.add(key)
-            unique_issues.append(issue)
-
-    return unique_issues
+    return issues
 
 
-def check_observability_extended(config: dict, working_dir: str) -> list[dict]:
+def check_observability_extended(config: dict, sources: list[dict]) -> list[dict]:
     """Extended observability checks (NEW v1.5.0)."""
     issues = []
 
@@ -1029,27 +1260,20 @@ def check_observability_extended(config: dict, working_dir: str) -> list[dict]:
 
     # OBS002: Logs enabled but no export destination indication
     # We can't detect dashboard destinations, but we can check for SDK usage
-    src_dir = Path(working_dir) / "src" if working_dir else None
     has_logging_sdk = False
 
-    if src_dir and src_dir.exists():
-        for ts_file in src_dir.rglob("*.ts"):
-            if "node_modules" in str(ts_file):
-                continue
-            try:
-                content = ts_file.read_text()
-                # Check for common logging SDK imports
-                if any(sdk in content for sdk in [
-                    '@logtail/',
-                    'axiom',
-                    'pino',
-                    'winston',
-                    'tail_consumers',  # Tail worker config
-                ]):
-                    has_logging_sdk = True
-                    break
-            except Exception:
-                pass
+    for source in sources:
+        content = source["content"]
+        # Check for common logging SDK imports
+        if any(sdk in content for sdk in [
+            '@logtail/',
+            'axiom',
+            'pino',
+            'winston',
+            'tail_consumers',  # Tail worker config
+        ]):
+            has_logging_sdk = True
+            break
 
     # Check for tail_consumers in config (indicates tail worker export)
     has_tail_consumers = bool(config.get("tail_consumers"))
@@ -1086,144 +1310,81 @@ def check_observability_extended(config: dict, working_dir: str) -> list[dict]:
     return issues
 
 
-def scan_source_for_loop_patterns(working_dir: str) -> list[dict]:
-    """Scan source code for loop-sensitive patterns that could cause billing issues."""
-    issues = []
-    src_dir = Path(working_dir) / "src"
+def scan_source_for_loop_patterns(sources: list[dict], disabled_rules: frozenset[str] = frozenset()) -> list[dict]:
+    """Scan source code for loop-sensitive patterns that could cause billing issues.
 
-    if not src_dir.exists():
-        return issues
+    Rules in disabled_rules (globally suppressed in .pre-deploy-ignore) are not scanned for.
+    """
+    issues = []
+    loop_patterns = [entry for entry in _LOOP_PATTERNS if entry[2] not in disabled_rules]
+    check_recursion = "LOOP005" not in disabled_rules
 
-    # Patterns to detect: (pattern, rule_id, severity, message, fix, detection_type)
-    loop_patterns = [
-        # D1 queries in loops
-        (
-            r'(for|while|forEach|\.map)\s*\([^)]*\)[^{]*\{[^}]*\.(prepare|run|first|all)\s*\(',
-            "LOOP002",
-            "CRITICAL",
-            "D1 query inside loop - N+1 cost explosion",
-            "Use db.batch() for bulk operations (TRAP-D1-001)",
-            "STATIC",
-        ),
-        # R2 writes in loops
-        (
-            r'(for|while|forEach|\.map)\s*\([^)]*\)[^{]*\{[^}]*\.put\s*\(',
-            "LOOP003",
-            "HIGH",
-            "R2 write inside loop - Class A operation explosion",
-            "Buffer writes or use multipart upload (TRAP-R2-001)",
-            "STATIC",
-        ),
-        # setInterval without clear pattern
-        (
-            r'setInterval\s*\([^)]+\)',
-            "LOOP004",
-            "MEDIUM",
-            "setInterval detected - verify termination condition exists",
-            "Use state.storage.setAlarm() in Durable Objects for hibernation",
-            "STATIC",
-        ),
-        # Unbounded while loops
-        (
-            r'while\s*\(\s*true\s*\)|for\s*\(\s*;\s*;\s*\)',
-            "LOOP007",
-            "CRITICAL",
-            "Unbounded loop detected - could run until CPU limit",
-            "Add explicit break condition and iteration limit",
-            "STATIC",
-        ),
-        # Self-fetch patterns
-        (
-            r'fetch\s*\(\s*request\.url',
-            "LOOP005",
-            "CRITICAL",
-            "Worker fetching own URL - potential infinite recursion",
-            "Add X-Recursion-Depth middleware (see loop-breaker skill)",
-            "STATIC",
-        ),
-        # Recursive function without depth
-        (
-            r'(async\s+)?function\s+(\w+)[^{]*\{[^}]*\2\s*\(',
-            "LOOP005",
-            "HIGH",
-            "Recursive function detected - verify depth limit exists",
-            "Add maxDepth parameter and check before recursing",
-            "HEURISTIC",
-        ),
-    ]
-
-    for ts_file in src_dir.rglob("*.ts"):
-        if "node_modules" in str(ts_file):
-            continue
+    for source in sources:
         # Skip test files - they often have patterns for testing edge cases
-        if is_test_file(str(ts_file)):
+        if is_test_file(source["path"]):
             continue
 
         try:
-            content = ts_file.read_text()
-            relative_path = ts_file.relative_to(working_dir)
+            content = source["content"]
+            relative_path = source["relative_path"]
 
             # Extract suppressions from this file
-            suppressions = extract_suppressions(content)
+            suppressions = source_suppressions(source)
 
-            for pattern, rule_id, severity, message, fix, detection in loop_patterns:
-                matches = list(re.finditer(pattern, content, re.MULTILINE | re.DOTALL))
-                for match in matches:
+            for pattern, literals, rule_id, severity, message, fix, detection in loop_patterns:
+                if not any(literal in content for literal in literals):
+                    continue
+                for match in pattern.finditer(content):
                     # Get line number
-                    line_num = content[:match.start()].count('\n') + 1
+                    line_num = source_line_number(source, match.start())
 
                     # Check if this issue is suppressed
                     if is_suppressed(suppressions, line_num, rule_id):
                         debug_log(f"Suppressed {rule_id} at {relative_path}:{line_num}")
                         continue
 
-                    # For recursive function detection (LOOP005), check for depth limiting
-                    if rule_id == "LOOP005" and "Recursive function" in message:
-                        # Get context around the match to check for depth limiting
-                        match_text = match.group(0)
-                        # Check if function has depth/maxDepth parameter or checks depth
-                        if re.search(r'(depth|maxDepth|level|count)\s*[<>=!]', match_text):
-                            continue  # Has depth check, skip
-                        # Check surrounding context (function signature and early body)
-                        start = max(0, match.start() - 50)
-                        end = min(len(content), match.end() + 200)
-                        context = content[start:end]
-                        if re.search(r'(depth|maxDepth|level)\s*[:<>=]|if\s*\(\s*(depth|maxDepth|level)', context, re.IGNORECASE):
-                            continue  # Has depth limiting, skip
-
-                    issue = {
+                    issues.append({
                         "id": rule_id,
                         "severity": severity,
                         "message": f"{message} at {relative_path}:{line_num}",
                         "fix": fix,
                         "detection": detection,
-                    }
-                    # Add verify hint for heuristic detections
-                    if detection == "HEURISTIC":
-                        issue["verify"] = "Check code manually to confirm this pattern"
-                    issues.append(issue)
+                    })
+
+            # Recursive function without depth (LOOP005)
+            if check_recursion and "function" in content:
+                for start, end in find_recursive_calls(content):
+                    line_num = source_line_number(source, start)
+
+                    if is_suppressed(suppressions, line_num, "LOOP005"):
+                        debug_log(f"Suppressed LOOP005 at {relative_path}:{line_num}")
+                        continue
+
+                    # Check if function has depth/maxDepth parameter or checks depth
+                    if _DEPTH_CHECK_RE.search(content, start, end):
+                        continue  # Has depth check, skip
+                    # Check surrounding context (function signature and early body)
+                    context = content[max(0, start - 50):end + 200]
+                    if _DEPTH_CONTEXT_RE.search(context):
+                        continue  # Has depth limiting, skip
+
+                    issues.append({
+                        "id": "LOOP005",
+                        "severity": "HIGH",
+                        "message": f"Recursive function detected - verify depth limit exists at {relative_path}:{line_num}",
+                        "fix": "Add maxDepth parameter and check before recursing",
+                        "detection": "HEURISTIC",
+                        "verify": "Check code manually to confirm this pattern",
+                    })
         except Exception:
             pass
 
-    # Deduplicate by rule and file location (full message includes file:line)
-    seen = set()
-    unique_issues = []
-    for issue in issues:
-        key = (issue["id"], issue["message"])
-        if key not in seen:
-            seen.add(key)
-            unique_issues.append(issue)
-
-    return unique_issues
+    return issues
 
 
-def estimate_loop_cost(working_dir: str, config: dict) -> list[dict]:
+def estimate_loop_cost(sources: list[dict], config: dict) -> list[dict]:
     """Estimate potential cost impact of detected loop patterns."""
     issues = []
-    src_dir = Path(working_dir) / "src"
-
-    if not src_dir.exists():
-        return issues
 
     # Cost rates (per million)
     COSTS = {
@@ -1237,38 +1398,25 @@ def estimate_loop_cost(working_dir: str, config: dict) -> list[dict]:
 
     estimated_costs = []
 
-    for ts_file in src_dir.rglob("*.ts"):
-        if "node_modules" in str(ts_file):
-            continue
-
+    for source in sources:
         try:
-            content = ts_file.read_text()
-            relative_path = ts_file.relative_to(working_dir)
-
-            # D1 writes in loops
-            d1_loop_matches = re.findall(
-                r'(for|while|forEach)\s*\([^)]*\)[^{]*\{[^}]*\.(run|batch)\s*\(',
-                content,
-                re.MULTILINE | re.DOTALL
-            )
-            if d1_loop_matches:
+            content = source["content"]
+            relative_path = source["relative_path"]
+
+            # D1 writes in loops (literal checks first; most files have neither call)
+            if (".run" in content or ".batch" in content) and _D1_WRITE_LOOP_RE.search(content):
                 estimated_costs.append({
                     "pattern": "D1 writes in loop",
-                    "file": str(relative_path),
+                    "file": relative_path,
                     "estimate": "If loop runs 1000× on 1000 requests: ~$1.00/day",
                     "formula": "iterations × requests × $1/M",
                 })
 
             # R2 writes in loops
-            r2_loop_matches = re.findall(
-                r'(for|while|forEach)\s*\([^)]*\)[^{]*\.put\s*\(',
-                content,
-                re.MULTILINE | re.DOTALL
-            )
-            if r2_loop_matches:
+            if ".put" in content and _R2_WRITE_LOOP_RE.search(content):
                 estimated_costs.append({
                     "pattern": "R2 writes in loop",
-                    "file": str(relative_path),
+                    "file": relative_path,
                     "estimate": "If loop runs 1000× on 1000 requests: ~$4.50/day",
                     "formula": "iterations × requests × $4.50/M",
                 })
@@ -1296,19 +1444,6 @@ def check_queue_dlq_comprehensive(config: dict) -> list[dict]:
     issues = []
     queues = config.get("queues", {})
     consumers = queues.get("consumers", [])
-    producers = queues.get("producers", [])
-
-    # Build list of all queue names for cross-reference
-    all_queues = set()
-    for consumer in consumers:
-        if isinstance(consumer, dict):
-            all_queues.add(consumer.get("queue", ""))
-            dlq = consumer.get("dead_letter_queue", "")
-            if dlq:
-                all_queues.add(dlq)
-    for producer in producers:
-        if isinstance(producer, dict):
-            all_queues.add(producer.get("queue", ""))
 
     for i, consumer in enumerate(consumers):
         if isinstance(consumer, dict):
@@ -1350,6 +1485,16 @@ def check_queue_dlq_comprehensive(config: dict) -> list[dict]:
     return issues
 
 
+def has_binding(config: dict, key: str) -> bool:
+    """Check if a binding type is declared at the top level or in any [env.*] section."""
+    if config.get(key):
+        return True
+    environments = config.get("env")
+    if not isinstance(environments, dict):
+        return False
+    return any(isinstance(env, dict) and env.get(key) for env in environments.values())
+
+
 def run_audit(config: dict, working_dir: str = "") -> tuple[list[dict], set[str]]:
     """Run all audit checks on config.
 
@@ -1359,17 +1504,22 @@ def run_audit(config: dict, working_dir: str = "") -> tuple[list[dict], set[str]
     """
     issues = []
 
-    # Load .pre-deploy-ignore file for project-level suppressions and blocking config
+    # Load .pre-deploy-ignore for project-level suppressions and blocking config
     if working_dir:
         ignore_rules, blocking_rules = load_ignore_file(working_dir)
     else:
         ignore_rules, blocking_rules = {}, set()
 
-    # Security checks
-    issues.extend(check_secrets_in_vars(config))
+    # Rules suppressed without a context can never be reported, so skip their scans
+    disabled_rules = frozenset(rule_id for rule_id, contexts in ignore_rules.items() if '' in contexts)
+
+    # Security checks (most configs have no vars, so skip the call entirely)
+    if "vars" in config:
+        issues.extend(check_secrets_in_vars(config))
 
     # Resilience checks
-    issues.extend(check_queue_dlq_comprehensive(config))  # Enhanced DLQ check
+    if "queues" in config:
+        issues.extend(check_queue_dlq_comprehensive(config))  # Enhanced DLQ check
 
     # Performance checks
     issues.extend(check_observability(config))
@@ -1382,34 +1532,113 @@ def run_audit(config: dict, working_dir: str = "") -> tuple[list[dict], set[str]
     issues.extend(check_deprecated_site_config(config))
 
     if working_dir:
+        # Read src/**/*.ts once; the source checks below share the contents
+        sources = load_source_files(working_dir)
+
         # Performance Budgeter - check bundle size
         issues.extend(check_bundle_size(working_dir, config))
 
         # Loop-Sensitive Resource Audit
-        issues.extend(scan_source_for_loop_patterns(working_dir))
+        issues.extend(scan_source_for_loop_patterns(sources, disabled_rules))
 
         # Cost Simulation for detected patterns
-        issues.extend(estimate_loop_cost(working_dir, config))
+        issues.extend(estimate_loop_cost(sources, config))
 
         # R2 Infrequent Access trap detection (NEW v1.4.0)
-        issues.extend(check_r2_infrequent_access(working_dir, config))
+        if "BUDGET009" not in disabled_rules:
+            issues.extend(check_r2_infrequent_access(sources, config))
 
-        # D1 Query pattern checks (NEW v1.5.0)
-        issues.extend(check_d1_query_patterns(working_dir))
+        # D1 Query pattern checks (NEW v1.5.0) - only Workers with a D1 binding
+        if has_binding(config, "d1_databases") and not {"QUERY001", "QUERY005"} <= disabled_rules:
+            issues.extend(check_d1_query_patterns(sources))
 
         # R2 cache pattern checks (NEW v1.5.0)
-        issues.extend(check_r2_cache_patterns(working_dir))
+        if "R2002" not in disabled_rules:
+            issues.extend(check_r2_cache_patterns(sources))
 
         # Extended observability checks (NEW v1.5.0)
-        issues.extend(check_observability_extended(config, working_dir))
+        issues.extend(check_observability_extended(config, sources))
 
         # AI usage pattern checks (NEW v1.6.0)
-        issues.extend(check_ai_patterns(working_dir, config))
+        if not {"AI001", "AI002"} <= disabled_rules:
+            issues.extend(check_ai_patterns(sources, config))
 
     # Apply .pre-deploy-ignore suppressions
     issues = filter_ignored_issues(issues, ignore_rules)
 
-    return issues, blocking_rules
+    return dedupe_issues(issues), blocking_rules
+
+
+def get_audit_fingerprint(config_path: str, working_dir: str) -> str:
+    """Fingerprint every input run_audit reads, using stat() only.
+
+    Covers the hook itself, the wrangler config, .pre-deploy-ignore,
+    package.json and the node_modules listing (heavy package detection)
+    and every file under src/ and dist/ (source scans and bundle size).
+    """
+    parts = []
+    for path in (__file__, config_path, os.path.join(working_dir, ".pre-deploy-ignore"),
+                 os.path.join(working_dir, "package.json"), os.path.join(working_dir, "node_modules")):
+        try:
+            st = os.stat(path)
+            parts.append(f"{path}:{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            parts.append(f"{path}:-")
+
+    for tree in ("src", "dist"):
+        for dirpath, dirnames, filenames in os.walk(os.path.join(working_dir, tree)):
+            dirnames[:] = sorted(d for d in dirnames if d != "node_modules")
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                    parts.append(f"{path}:{st.st_mtime_ns}:{st.st_size}")
+                except OSError:
+                    pass
+
+    return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+def load_cached_audit(working_dir: str, fingerprint: str) -> tuple[list[dict], set[str]] | None:
+    """Return cached (issues, blocking_rules) if the fingerprint still matches."""
+    try:
+        with open(AUDIT_CACHE_PATH, "r") as f:
+            entry = json.load(f).get(working_dir)
+        if entry and entry.get("fingerprint") == fingerprint:
+            return entry["issues"], set(entry["blocking_rules"])
+    except (OSError, ValueError, KeyError, AttributeError, TypeError):
+        pass
+    return None
+
+
+def save_cached_audit(working_dir: str, fingerprint: str, issues: list[dict], blocking_rules: set[str]) -> None:
+    """Store audit results for working_dir (atomic replace, best effort)."""
+    try:
+        try:
+            with open(AUDIT_CACHE_PATH, "r") as f:
+                cache = json.load(f)
+            if not isinstance(cache, dict):
+                cache = {}
+        except (OSError, ValueError):
+            cache = {}
+
+        # Re-insert so the most recent project is last; drop the oldest ones
+        cache.pop(working_dir, None)
+        cache[working_dir] = {
+            "fingerprint": fingerprint,
+            "issues": issues,
+            "blocking_rules": sorted(blocking_rules),
+        }
+        while len(cache) > AUDIT_CACHE_MAX_PROJECTS:
+            cache.pop(next(iter(cache)))
+
+        AUDIT_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{AUDIT_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, AUDIT_CACHE_PATH)
+    except OSError as e:
+        debug_log(f"Failed to write audit cache: {e}")  # Cache is best effort
 
 
 def format_issues(issues: list[dict], blocking_rules: set[str] = None) -> str:
@@ -1423,17 +1652,24 @@ def format_issues(issues: list[dict], blocking_rules: set[str] = None) -> str:
     if not issues:
         return ""
 
-    # Separate issues based on what actually blocks
-    if blocking_rules is not None:
-        # Use the actual blocking rules set
-        blocking_issues = [i for i in issues if i.get("id") in blocking_rules]
-        warning_issues = [i for i in issues if i.get("id") not in blocking_rules and i.get("id") != "COST_SIM"]
-    else:
-        # Fallback: use severity (legacy behavior)
-        blocking_issues = [i for i in issues if i.get("severity") == "CRITICAL"]
-        warning_issues = [i for i in issues if i.get("severity") != "CRITICAL" and i.get("id") != "COST_SIM"]
-
-    cost_sim = [i for i in issues if i.get("id") == "COST_SIM"]
+    # Separate issues based on what actually blocks (single pass)
+    blocking_issues = []
+    warning_issues = []
+    cost_sim = []
+    for issue in issues:
+        issue_id = issue.get("id")
+        if blocking_rules is not None:
+            # Use the actual blocking rules set
+            is_blocking = issue_id in blocking_rules
+        else:
+            # Fallback: use severity (legacy behavior)
+            is_blocking = issue.get("severity") == "CRITICAL"
+        if is_blocking:
+            blocking_issues.append(issue)
+        elif issue_id != "COST_SIM":
+            warning_issues.append(issue)
+        if issue_id == "COST_SIM":
+            cost_sim.append(issue)
 
     lines = []
 
@@ -1481,7 +1717,7 @@ def format_issues(issues: list[dict], blocking_rules: set[str] = None) -> str:
     if blocking_issues:
         lines.append("🛑 BLOCKING ISSUES (deployment will fail):")
         lines.append("-" * 50)
-        for issue in blocking_issues:
+        for issue in blocking_issues[:MAX_ISSUES_PER_SECTION]:
             detection = issue.get("detection", "STATIC")
             lines.append(f"   🔴 [{issue['id']}] [{detection}] {issue['severity']}")
             lines.append(f"      {issue['message']}")
@@ -1492,13 +1728,16 @@ def format_issues(issues: list[dict], blocking_rules: set[str] = None) -> str:
             suppress = issue.get("suppress", f"// @pre-deploy-ok {issue['id']}")
             lines.append(f"      Suppress: {suppress}")
             lines.append("")
+        if blocking_count > MAX_ISSUES_PER_SECTION:
+            lines.append(f"   ... and {blocking_count - MAX_ISSUES_PER_SECTION} more blocking issues")
+            lines.append("")
 
     # NON-BLOCKING WARNINGS section
     if warning_issues:
         lines.append("⚠️  NON-BLOCKING WARNINGS (deployment allowed):")
         lines.append("-" * 50)
-        for issue in warning_issues:
-            emoji = {"CRITICAL": "🔴", "HIGH": "🟠", "MEDIUM": "🟡", "LOW": "🔵", "INFO": "🔵"}.get(issue["severity"], "⚪")
+        for issue in warning_issues[:MAX_ISSUES_PER_SECTION]:
+            emoji = _SEVERITY_EMOJI.get(issue["severity"], "⚪")
             detection = issue.get("detection", "STATIC")
             lines.append(f"   {emoji} [{issue['id']}] [{detection}] {issue['severity']}")
             lines.append(f"      {issue['message']}")
@@ -1507,6 +1746,9 @@ def format_issues(issues: list[dict], blocking_rules: set[str] = None) -> str:
                 verify = issue.get("verify", "Check code manually to confirm")
                 lines.append(f"      Verify: {verify}")
             lines.append("")
+        if warning_count > MAX_ISSUES_PER_SECTION:
+            lines.append(f"   ... and {warning_count - MAX_ISSUES_PER_SECTION} more warnings")
+            lines.append("")
 
     # Cost simulation section (if present)
     if cost_sim:
@@ -1527,15 +1769,7 @@ def check_bypass_in_command(command: str) -> bool:
     The env var is set for wrangler, not for the hook process.
     We detect the user's intent by parsing the command.
     """
-    bypass_patterns = [
-        r'\bSKIP_PREDEPLOY_CHECK\s*=\s*["\']?1["\']?',
-        r'\bSKIP_PREDEPLOY_CHECK\s*=\s*["\']?true["\']?',
-        r'\bSKIP_PREDEPLOY_CHECK\s*=\s*["\']?yes["\']?',
-    ]
-    for pattern in bypass_patterns:
-        if re.search(pattern, command, re.IGNORECASE):
-            return True
-    return False
+    return _BYPASS_RE.search(command) is not None
 
 
 def main():
@@ -1571,10 +1805,16 @@ def main():
         sys.exit(0)
 
     # Read input from stdin
+    raw_input = sys.stdin.buffer.read()
+
+    # Cheap byte checks before parsing: payloads from other tools (Edit, Read,
+    # Write...) and non-wrangler commands never need a full JSON decode
+    if b'"Bash"' not in raw_input or b"wrangler" not in raw_input.lower():
+        sys.exit(0)
+
     try:
-        raw_input = sys.stdin.read()
         input_data = json.loads(raw_input)
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
         debug_log(f"JSON decode error: {e}")
         sys.exit(0)  # Allow if we can't parse
 
@@ -1587,16 +1827,16 @@ def main():
 
     command = tool_input.get("command", "")
 
+    # Only check wrangler deploy commands
+    if not is_wrangler_deploy(command):
+        sys.exit(0)
+
     # Check for bypass in command string (user intent detection)
     # This handles: SKIP_PREDEPLOY_CHECK=1 npx wrangler deploy
     if check_bypass_in_command(command):
         debug_log(f"SKIP_PREDEPLOY_CHECK found in command, bypassing validation: {command}")
         sys.exit(0)
 
-    # Only check wrangler deploy commands
-    if not is_wrangler_deploy(command):
-        sys.exit(0)
-
     debug_log(f"Intercepted wrangler deploy: {command}")
 
     # Get working directory from environment
@@ -1611,81 +1851,99 @@ def main():
 
     debug_log(f"Found config: {config_path}")
 
-    # Load and parse config
-    config = load_wrangler_config(config_path)
-    if not config:
-        debug_log("Failed to parse config")
-        sys.exit(0)  # Allow if we can't parse
+    # Reuse the previous audit when no audited file has changed since
+    # (PREDEPLOY_NOCACHE skips the fingerprint walk and the cache entirely)
+    fingerprint = None if CACHE_DISABLED else get_audit_fingerprint(config_path, working_dir)
+    cached = load_cached_audit(working_dir, fingerprint) if fingerprint else None
+    if cached is not None:
+        debug_log("Audit inputs unchanged, using cached results")
+        issues, blocking_rules = cached
+    else:
+        # Load and parse config
+        config = load_wrangler_config(config_path)
+        if not config:
+            debug_log("Failed to parse config")
+            sys.exit(0)  # Allow if we can't parse
 
-    # Run audit with working directory for bundle size check
-    issues, blocking_rules = run_audit(config, working_dir)
+        # Run audit with working directory for bundle size check
+        issues, blocking_rules = run_audit(config, working_dir)
+        if fingerprint:
+            save_cached_audit(working_dir, fingerprint, issues, blocking_rules)
 
     if not issues:
         debug_log("No issues found, allowing deploy")
         sys.exit(0)
 
     # Separate blocking issues from warnings (blocking is opt-in via .pre-deploy-ignore)
-    blocking_issues = [i for i in issues if i.get("id") in blocking_rules]
-    warning_issues = [i for i in issues if i.get("id") not in blocking_rules]
-
-    # Count by severity for summary display
-    high_count = sum(1 for i in warning_issues if i.get("severity") in ("CRITICAL", "HIGH"))
-    medium_count = sum(1 for i in warning_issues if i.get("severity") == "MEDIUM")
+    # and count warnings by severity for summary display, in one pass
+    blocking_issues = []
+    warning_issues = []
+    high_count = 0
+    medium_count = 0
+    for issue in issues:
+        if issue.get("id") in blocking_rules:
+            blocking_issues.append(issue)
+            continue
+        warning_issues.append(issue)
+        severity = issue.get("severity")
+        if severity in ("CRITICAL", "HIGH"):
+            high_count += 1
+        elif severity == "MEDIUM":
+            medium_count += 1
 
     # Format and output issues (pass blocking_rules for proper categorization)
     output = format_issues(issues, blocking_rules if blocking_rules else None)
+    lines = [output]
 
     # DECISION: Block or Allow?
     if blocking_issues:
         # User has opted-in to blocking for these rules via .pre-deploy-ignore
         # Format agent-readable blocking message
-        output += "\n"
-        output += "━" * 60 + "\n"
-        output += "🛑 DEPLOYMENT BLOCKED (by project config)\n"
-        output += "━" * 60 + "\n"
-        output += "\n"
-        output += f"WHAT: {len(blocking_issues)} blocking issue(s) detected\n"
-        output += "WHY:  Project .pre-deploy-ignore has opted into blocking for these rules\n"
-        output += "\n"
-        output += "BLOCKING ISSUES:\n"
+        lines.append("━" * 60)
+        lines.append("🛑 DEPLOYMENT BLOCKED (by project config)")
+        lines.append("━" * 60)
+        lines.append("")
+        lines.append(f"WHAT: {len(blocking_issues)} blocking issue(s) detected")
+        lines.append("WHY:  Project .pre-deploy-ignore has opted into blocking for these rules")
+        lines.append("")
+        lines.append("BLOCKING ISSUES:")
         for issue in blocking_issues:
             rule_id = issue.get("id", "UNKNOWN")
-            output += f"  • {rule_id}: {issue.get('message', 'No message')}\n"
-        output += "\n"
-        output += "OPTIONS:\n"
-        output += "  1. FIX: Address the issues listed above (recommended)\n"
-        output += "  2. SUPPRESS: Add inline comment: // @pre-deploy-ok RULE_ID\n"
-        output += "  3. DISABLE BLOCKING: Remove !RULE_ID from .pre-deploy-ignore\n"
-        output += "  4. OVERRIDE: Run with SKIP_PREDEPLOY_CHECK=1\n"
-        output += "\n"
+            lines.append(f"  • {rule_id}: {issue.get('message', 'No message')}")
+        lines.append("")
+        lines.append("OPTIONS:")
+        lines.append("  1. FIX: Address the issues listed above (recommended)")
+        lines.append("  2. SUPPRESS: Add inline comment: // @pre-deploy-ok RULE_ID")
+        lines.append("  3. DISABLE BLOCKING: Remove !RULE_ID from .pre-deploy-ignore")
+        lines.append("  4. OVERRIDE: Run with SKIP_PREDEPLOY_CHECK=1")
+        lines.append("")
         if warning_issues:
-            output += f"ALSO: {len(warning_issues)} additional warnings (non-blocking)\n"
-        output += "━" * 60 + "\n"
+            lines.append(f"ALSO: {len(warning_issues)} additional warnings (non-blocking)")
+        lines.append("━" * 60)
 
-        print(output, file=sys.stderr)
+        sys.stderr.buffer.write(("\n".join(lines) + "\n\n").encode("utf-8"))
         sys.exit(2)  # Block deployment - returns control to Claude
     else:
         # Default: All issues are warnings - deployment proceeds
-        output += "\n"
-        output += "━" * 60 + "\n"
-        output += "✅ DEPLOYMENT ALLOWED\n"
-        output += "━" * 60 + "\n"
-        output += "\n"
+        lines.append("━" * 60)
+        lines.append("✅ DEPLOYMENT ALLOWED")
+        lines.append("━" * 60)
+        lines.append("")
         total_warnings = len(warning_issues)
         if total_warnings > 0:
             if high_count > 0:
-                output += f"⚠️  {high_count} high-priority warning(s) detected\n"
+                lines.append(f"⚠️  {high_count} high-priority warning(s) detected")
             if medium_count > 0:
-                output += f"ℹ️  {medium_count} advisory issue(s) detected\n"
-            output += "\n"
-            output += "TIP: To block deployment on specific rules, add to .pre-deploy-ignore:\n"
-            output += "     !SEC001    # Block on plaintext secrets\n"
-            output += "     !LOOP005   # Block on self-recursion\n"
-        output += "\n"
-        output += "Deployment proceeding.\n"
-        output += "━" * 60 + "\n"
-
-        print(output, file=sys.stderr)
+                lines.append(f"ℹ️  {medium_count} advisory issue(s) detected")
+            lines.append("")
+            lines.append("TIP: To block deployment on specific rules, add to .pre-deploy-ignore:")
+            lines.append("     !SEC001    # Block on plaintext secrets")
+            lines.append("     !LOOP005   # Block on self-recursion")
+        lines.append("")
+        lines.append("Deployment proceeding.")
+        lines.append("━" * 60)
+
+        sys.stderr.buffer.write(("\n".join(lines) + "\n\n").encode("utf-8"))
         sys.exit(0)  # Allow deployment
 
 